@@ -5,36 +5,81 @@ A standalone Streamlit app combining CrewAI agents, predictive modeling, and RPG
 Run with: streamlit run strategic_advisor_app.py
 """
 
+from __future__ import annotations
+
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, replace
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import asyncio
+import importlib.util
 import json
-import random
-import re
 import os
-import sys
+import re
+from string import Template
+
+# pandas and plotly are imported where they are used, so a cold start can paint the
+# chat tab before the analytics stack loads
+if TYPE_CHECKING:
+    import pandas as pd
+    import plotly.graph_objects as go
+
+# ML libs are only probed here and imported inside StrategicForecaster.fit,
+# so sessions that never fit a model don't pay their import cost
+SKLEARN_AVAILABLE = importlib.util.find_spec("sklearn") is not None
+if not SKLEARN_AVAILABLE:
+    st.warning("scikit-learn not installed. Using statistical forecasting fallback.")
+
+# LightGBM is optional; sklearn's histogram GB is used when it is missing
+LIGHTGBM_AVAILABLE = importlib.util.find_spec("lightgbm") is not None
 
-# Try to import ML libs, provide mock fallback if not available
+# plotly-resampler is optional; it downsamples long KPI series before they reach the browser
+RESAMPLER_AVAILABLE = importlib.util.find_spec("plotly_resampler") is not None
+# Only series longer than this are worth aggregating
+_RESAMPLE_MIN_POINTS = 1000
+
+# Numba is optional; without it the forecasting kernels run as plain Python
 try:
-    from sklearn.ensemble import GradientBoostingRegressor
-    from sklearn.linear_model import LinearRegression
-    SKLEARN_AVAILABLE = True
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
 except ImportError:
-    SKLEARN_AVAILABLE = False
-    st.warning("scikit-learn not installed. Using statistical forecasting fallback.")
+    NUMBA_AVAILABLE = False
+    prange = range
+    
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
 
-# Try to import CrewAI, provide mock implementation if not available
+# orjson is optional; it serializes the crew's data payload (including ndarrays) much faster
 try:
-    from crewai import Agent, Task, Crew, Process
-    from langchain_community.llms import Ollama
-    CREWAI_AVAILABLE = True
+    import orjson
+    
+    def _dumps(data) -> str:
+        return orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=str
+        ).decode()
 except ImportError:
-    CREWAI_AVAILABLE = False
+    def _json_default(obj):
+        # Mirror OPT_SERIALIZE_NUMPY: arrays/scalars become plain lists/numbers
+        return obj.tolist() if hasattr(obj, "tolist") else str(obj)
+    
+    def _dumps(data) -> str:
+        return json.dumps(data, indent=2, default=_json_default)
+
+# CrewAI/LangChain are heavy to import; only probe for them so the demo path stays light
+CREWAI_AVAILABLE = (
+    importlib.util.find_spec("crewai") is not None
+    and importlib.util.find_spec("langchain_community") is not None
+)
+
+# Ollama is optional; "Local Ollama" mode falls back to DemoLLM without it
+OLLAMA_AVAILABLE = importlib.util.find_spec("ollama") is not None
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.2")
 
 # =============================================================================
 # CONFIGURATION & STYLING
@@ -48,7 +93,7 @@ st.set_page_config(
 )
 
 # Custom CSS for glass-morphism dark theme
-st.markdown("""
+_APP_CSS = """
 <style>
     .main {
         background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
@@ -125,13 +170,17 @@ st.markdown("""
         background: rgba(15, 23, 42, 0.95);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Streamlit drops elements a rerun does not emit again, so the style block must
+# be sent every run rather than injected once behind a session-state flag
+st.markdown(_APP_CSS, unsafe_allow_html=True)
 
 # =============================================================================
 # GAMIFICATION SYSTEM
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class Achievement:
     id: str
     name: str
@@ -143,7 +192,7 @@ class Achievement:
     unlocked: bool = False
     unlocked_date: Optional[datetime] = None
 
-@dataclass
+@dataclass(slots=True)
 class Mission:
     id: str
     name: str
@@ -154,9 +203,88 @@ class Mission:
     progress: int = 0
     target: int = 1
 
+# Immutable templates; each session gets fresh copies via dataclasses.replace
+_ACH_TEMPLATE = (
+    Achievement("first_steps", "First Steps", "Solve your first strategic problem", "🎯", 100, "problems_solved", 1),
+    Achievement("workflow_master", "Workflow Master", "Complete 5 strategic analyses", "⚡", 250, "problems_solved", 5),
+    Achievement("analyst", "Intelligence Analyst", "Run 10 predictive forecasts", "📊", 300, "analysis_runs", 10),
+    Achievement("strategist", "Grand Strategist", "Accumulate 1000 XP", "💡", 400, "xp_total", 1000),
+    Achievement("cas_expert", "CAS Modeler", "Use all predictive models once", "🧮", 500, "specific_action", 4),
+    Achievement("plugin_explorer", "Plugin Explorer", "Try 3 different scenario types", "🔌", 350, "specific_action", 3),
+    Achievement("week_warrior", "Week Warrior", "Maintain a 7-day streak", "🔥", 500, "streak_days", 7),
+    Achievement("legend", "Strategic Legend", "Reach Level 10", "👑", 1000, "level", 10)
+)
+
+_MISSION_TEMPLATE = (
+    Mission("daily_analysis", "Daily Intel", "Run one strategic analysis", 50, "analysis", False, 0, 1),
+    Mission("daily_chat", "Consultation", "Send 3 messages to the advisor", 30, "chat", False, 0, 3),
+    Mission("daily_forecast", "Forecaster", "Generate a 6-month forecast", 40, "forecast", False, 0, 1)
+)
+
+def _mission_card_html(mission: Mission) -> str:
+    progress_pct = min(100, (mission.progress / mission.target) * 100)
+    return (
+        f'<div class="metric-card">'
+        f'<strong>{mission.name}</strong> (+{mission.xp_reward} XP)<br>'
+        f'<small>{mission.description}</small><br>'
+        f'<div style="background: rgba(255,255,255,0.1); height: 6px; border-radius: 3px; margin-top: 5px;">'
+        f'<div style="background: #3b82f6; width: {progress_pct}%; height: 100%; border-radius: 3px;"></div>'
+        f'</div>'
+        f'<small>{mission.progress}/{mission.target}</small>'
+        f'</div>'
+    )
+
+def _ach_row_html(ach: Achievement) -> str:
+    status = "✅" if ach.unlocked else "🔒"
+    return f'<div style="margin: 4px 0;">{status} {ach.icon} <strong>{ach.name}</strong> (+{ach.xp_reward} XP)</div>'
+
+# Missions-page card, with the completed/pending styling baked into one template per state
+_MISSION_CARD = Template("""
+                    <div class="glass-card" style="border: $border;">
+                        <h4>$icon $$name</h4>
+                        <p>$$desc</p>
+                        <div style="background: rgba(255,255,255,0.1); height: 10px; border-radius: 5px; margin: 10px 0;">
+                            <div style="background: $bar; width: $$pct%; height: 100%; border-radius: 5px; transition: width 0.3s;"></div>
+                        </div>
+                        <small>$$progress/$$target completed • +$$xp XP</small>
+                    </div>
+                """)
+_MISSION_TPL_DONE = Template(_MISSION_CARD.substitute(border="2px solid #10b981", icon="✅", bar="#10b981"))
+_MISSION_TPL_TODO = Template(_MISSION_CARD.substitute(border="1px solid rgba(255,255,255,0.1)", icon="⏳", bar="#3b82f6"))
+
+def _mission_page_card_html(mission: Mission) -> str:
+    return (_MISSION_TPL_DONE if mission.completed else _MISSION_TPL_TODO).substitute(
+        name=mission.name,
+        desc=mission.description,
+        pct=min(100, (mission.progress / mission.target) * 100),
+        progress=mission.progress,
+        target=mission.target,
+        xp=mission.xp_reward
+    )
+
+# Streamlit re-executes this module on every rerun, so this is resolved once per run
+_RUN_DATE = date.today()
+
+def _today() -> date:
+    return _RUN_DATE
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _today_key() -> int:
+    """UTC day ordinal for the daily-missions rollover; shared by all sessions, re-read at most hourly"""
+    return datetime.now(timezone.utc).toordinal()
+
+# Chat history keeps only the most recent messages; older ones are evicted on append
+_CHAT_HISTORY_MAX = 200
+
+# Column of the live-counter vector each achievement condition type is compared against
+_ACH_CONDITION_INDEX = {"problems_solved": 0, "xp_total": 1, "streak_days": 2, "level": 3}
+
 class GamificationEngine:
     def __init__(self):
+        self._deferred = False
+        self._pending_notifications = []
         self.initialize_session_state()
+        self._build_achievement_table()
     
     def initialize_session_state(self):
         defaults = {
@@ -164,39 +292,58 @@ class GamificationEngine:
             'level': 1,
             'problems_solved': 0,
             'current_streak': 0,
-            'last_active': datetime.now().date(),
-            'achievements': self._default_achievements(),
-            'missions': self._default_missions(),
+            'last_active': _today(),
+            # Factories: only invoked for sessions that don't have these yet
+            'achievements': self._default_achievements,
+            'missions': self._default_missions,
             'total_points': 0,
             'analysis_runs': 0,
-            'chat_messages': [],
+            'chat_messages': lambda: deque(maxlen=_CHAT_HISTORY_MAX),
             'unlocked_notifications': []
         }
         for key, value in defaults.items():
             if key not in st.session_state:
-                st.session_state[key] = value
+                st.session_state[key] = value() if callable(value) else value
+    
+    def _build_achievement_table(self):
+        """Lay achievement thresholds out as arrays so unlocks are checked in one vectorized pass"""
+        achievements = st.session_state.achievements
+        # Condition types without a live counter (e.g. 'specific_action') can never unlock here
+        self._ach_thresholds = np.array(
+            [a.threshold if a.condition_type in _ACH_CONDITION_INDEX else np.inf for a in achievements],
+            dtype=float
+        )
+        self._ach_cond_idx = np.array(
+            [_ACH_CONDITION_INDEX.get(a.condition_type, 0) for a in achievements],
+            dtype=np.intp
+        )
     
     def _default_achievements(self) -> List[Achievement]:
-        return [
-            Achievement("first_steps", "First Steps", "Solve your first strategic problem", "🎯", 100, "problems_solved", 1),
-            Achievement("workflow_master", "Workflow Master", "Complete 5 strategic analyses", "⚡", 250, "problems_solved", 5),
-            Achievement("analyst", "Intelligence Analyst", "Run 10 predictive forecasts", "📊", 300, "analysis_runs", 10),
-            Achievement("strategist", "Grand Strategist", "Accumulate 1000 XP", "💡", 400, "xp_total", 1000),
-            Achievement("cas_expert", "CAS Modeler", "Use all predictive models once", "🧮", 500, "specific_action", 4),
-            Achievement("plugin_explorer", "Plugin Explorer", "Try 3 different scenario types", "🔌", 350, "specific_action", 3),
-            Achievement("week_warrior", "Week Warrior", "Maintain a 7-day streak", "🔥", 500, "streak_days", 7),
-            Achievement("legend", "Strategic Legend", "Reach Level 10", "👑", 1000, "level", 10)
-        ]
+        return [replace(a) for a in _ACH_TEMPLATE]
     
     def _default_missions(self) -> List[Mission]:
-        daily = [
-            Mission("daily_analysis", "Daily Intel", "Run one strategic analysis", 50, "analysis", False, 0, 1),
-            Mission("daily_chat", "Consultation", "Send 3 messages to the advisor", 30, "chat", False, 0, 3),
-            Mission("daily_forecast", "Forecaster", "Generate a 6-month forecast", 40, "forecast", False, 0, 1)
-        ]
-        return daily
+        return [replace(m) for m in _MISSION_TEMPLATE]
+    
+    @contextmanager
+    def _batch(self):
+        """Defer achievement checks and notifications until the outermost public call finishes"""
+        if self._deferred:
+            yield
+            return
+        self._deferred = True
+        try:
+            yield
+        finally:
+            self._deferred = False
+        self._check_achievements()
+        self._flush_notifications()
     
     def add_xp(self, amount: int, reason: str = ""):
+        with self._batch():
+            self._award_xp(amount)
+            self._update_missions("xp", amount)
+    
+    def _award_xp(self, amount: int):
         old_level = st.session_state.level
         st.session_state.xp += amount
         st.session_state.total_points += amount
@@ -206,54 +353,52 @@ class GamificationEngine:
         if new_level > old_level:
             st.session_state.level = new_level
             self._notify(f"🎉 Level Up! You are now Level {new_level}!", "level_up")
-        
-        self._check_achievements()
-        self._update_missions("xp", amount)
     
     def record_problem_solved(self):
-        st.session_state.problems_solved += 1
-        self.add_xp(100, "Problem solved")
-        self._update_missions("problem")
-        self._check_achievements()
+        with self._batch():
+            st.session_state.problems_solved += 1
+            self.add_xp(100, "Problem solved")
+            self._update_missions("problem")
     
     def record_analysis(self, analysis_type: str = "general"):
-        st.session_state.analysis_runs += 1
-        self.add_xp(50, f"Analysis: {analysis_type}")
-        self._update_missions("analysis")
-        self._check_achievements()
+        with self._batch():
+            st.session_state.analysis_runs += 1
+            self.add_xp(50, f"Analysis: {analysis_type}")
+            self._update_missions("analysis")
     
     def check_streak(self):
-        today = datetime.now().date()
-        last = st.session_state.last_active
-        if today - last == timedelta(days=1):
-            st.session_state.current_streak += 1
-            if st.session_state.current_streak in [7, 30]:
-                self.add_xp(st.session_state.current_streak * 10, "Streak bonus")
-        elif today > last:
-            st.session_state.current_streak = 1
-        st.session_state.last_active = today
-        self._check_achievements()
+        with self._batch():
+            today = _today()
+            last = st.session_state.last_active
+            if today - last == timedelta(days=1):
+                st.session_state.current_streak += 1
+                if st.session_state.current_streak in [7, 30]:
+                    self.add_xp(st.session_state.current_streak * 10, "Streak bonus")
+            elif today > last:
+                st.session_state.current_streak = 1
+            st.session_state.last_active = today
     
     def _check_achievements(self):
-        for ach in st.session_state.achievements:
-            if ach.unlocked:
-                continue
-            
-            unlocked = False
-            if ach.condition_type == "problems_solved" and st.session_state.problems_solved >= ach.threshold:
-                unlocked = True
-            elif ach.condition_type == "xp_total" and st.session_state.xp >= ach.threshold:
-                unlocked = True
-            elif ach.condition_type == "streak_days" and st.session_state.current_streak >= ach.threshold:
-                unlocked = True
-            elif ach.condition_type == "level" and st.session_state.level >= ach.threshold:
-                unlocked = True
+        achievements = st.session_state.achievements
+        # Achievement rewards can push XP/level over further thresholds, so sweep until stable
+        while True:
+            current = np.array([
+                st.session_state.problems_solved,
+                st.session_state.xp,
+                st.session_state.current_streak,
+                st.session_state.level
+            ], dtype=float)
+            unlocked_mask = np.fromiter((a.unlocked for a in achievements), dtype=bool, count=len(achievements))
+            newly = ~unlocked_mask & (self._ach_thresholds <= current[self._ach_cond_idx])
+            if not newly.any():
+                break
             
-            if unlocked:
+            for i in np.flatnonzero(newly):
+                ach = achievements[i]
                 ach.unlocked = True
                 ach.unlocked_date = datetime.now()
-                self.add_xp(ach.xp_reward, f"Achievement: {ach.name}")
-                st.session_state.unlocked_notifications.append(f"🏆 Achievement Unlocked: {ach.name} {ach.icon}")
+                self._award_xp(ach.xp_reward)
+                self._queue_notification(f"🏆 Achievement Unlocked: {ach.name} {ach.icon}")
     
     def _update_missions(self, action_type: str, amount: int = 1):
         for mission in st.session_state.missions:
@@ -265,7 +410,18 @@ class GamificationEngine:
                 if mission.progress >= mission.target:
                     mission.completed = True
                     self.add_xp(mission.xp_reward, f"Mission: {mission.name}")
-                    st.session_state.unlocked_notifications.append(f"✅ Mission Complete: {mission.name}")
+                    self._queue_notification(f"✅ Mission Complete: {mission.name}")
+    
+    def _queue_notification(self, message: str):
+        if self._deferred:
+            self._pending_notifications.append(message)
+        else:
+            st.session_state.unlocked_notifications.append(message)
+    
+    def _flush_notifications(self):
+        if self._pending_notifications:
+            st.session_state.unlocked_notifications.extend(self._pending_notifications)
+            self._pending_notifications = []
     
     def _notify(self, message: str, msg_type: str):
         if msg_type not in st.session_state:
@@ -308,47 +464,109 @@ class GamificationEngine:
             # Notifications
             if st.session_state.unlocked_notifications:
                 st.markdown("---")
-                for notif in st.session_state.unlocked_notifications:
-                    st.markdown(f"<div class='achievement-unlocked'>{notif}</div>", unsafe_allow_html=True)
+                st.markdown("".join(
+                    f"<div class='achievement-unlocked'>{notif}</div>"
+                    for notif in st.session_state.unlocked_notifications
+                ), unsafe_allow_html=True)
                 st.session_state.unlocked_notifications = []
             
-            # Active Missions
+            # Active Missions (one markdown element for the whole block)
             st.markdown("---")
             st.markdown("### 📋 Active Missions")
-            for mission in st.session_state.missions:
-                if not mission.completed:
-                    progress_pct = min(100, (mission.progress / mission.target) * 100)
-                    st.markdown(f"""
-                        <div class="metric-card">
-                            <strong>{mission.name}</strong> (+{mission.xp_reward} XP)<br>
-                            <small>{mission.description}</small><br>
-                            <div style="background: rgba(255,255,255,0.1); height: 6px; border-radius: 3px; margin-top: 5px;">
-                                <div style="background: #3b82f6; width: {progress_pct}%; height: 100%; border-radius: 3px;"></div>
-                            </div>
-                            <small>{mission.progress}/{mission.target}</small>
-                        </div>
-                    """, unsafe_allow_html=True)
+            missions_html = "".join(_mission_card_html(m) for m in st.session_state.missions if not m.completed)
+            if missions_html:
+                st.markdown(missions_html, unsafe_allow_html=True)
             
             # Achievements Progress
             with st.expander("🏆 Achievements"):
-                for ach in st.session_state.achievements:
-                    status = "✅" if ach.unlocked else "🔒"
-                    st.markdown(f"{status} {ach.icon} **{ach.name}** (+{ach.xp_reward} XP)")
+                st.markdown(
+                    "".join(_ach_row_html(a) for a in st.session_state.achievements),
+                    unsafe_allow_html=True
+                )
 
 # =============================================================================
 # PREDICTIVE MODELING (Open Source)
 # =============================================================================
 
+@njit(parallel=True, cache=True, fastmath=True)
+def _linreg_forecast(values: np.ndarray, noise: np.ndarray):
+    """Closed-form linear trend per column plus scaled noise; returns (point, lower, upper) as (n_cols, steps)"""
+    n, n_cols = values.shape
+    steps = noise.shape[0]
+    x = np.arange(n).astype(np.float64)
+    sx = 0.0
+    sxx = 0.0
+    for i in range(n):
+        sx += x[i]
+        sxx += x[i] * x[i]
+    denom = n * sxx - sx * sx
+    
+    point = np.empty((n_cols, steps))
+    lower = np.empty((n_cols, steps))
+    upper = np.empty((n_cols, steps))
+    for j in prange(n_cols):
+        sy = 0.0
+        sxy = 0.0
+        for i in range(n):
+            sy += values[i, j]
+            sxy += x[i] * values[i, j]
+        slope = (n * sxy - sx * sy) / denom
+        intercept = (sy - slope * sx) / n
+        
+        mean = sy / n
+        ss = 0.0
+        for i in range(n):
+            d = values[i, j] - mean
+            ss += d * d
+        std = np.sqrt(ss / (n - 1))
+        
+        for k in range(steps):
+            y = intercept + slope * (n + k) + noise[k, j] * std * 0.1
+            point[j, k] = y
+            lower[j, k] = y - std
+            upper[j, k] = y + std
+    return point, lower, upper
+
+# Called once per scenario horizon on a _gen_scenario cache miss, not on every rerun
+@njit(cache=True, fastmath=True)
+def _cumsum_normal(mus: np.ndarray, sigmas: np.ndarray, months: int, seed: int) -> np.ndarray:
+    """Gaussian random walks, one column per (mu, sigma), written straight into a (months, n_cols) array"""
+    np.random.seed(seed)
+    n_cols = mus.shape[0]
+    out = np.empty((months, n_cols))
+    for j in range(n_cols):
+        acc = 0.0
+        for i in range(months):
+            acc += mus[j] + sigmas[j] * np.random.normal()
+            out[i, j] = acc
+    return out
+
+@st.cache_resource(show_spinner=False)
+def _predict_pool() -> ThreadPoolExecutor:
+    """Process-wide pool for per-target predict calls (the script module is re-executed every rerun)"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="forecast-predict")
+
 class StrategicForecaster:
     def __init__(self, model_type="ensemble"):
         self.model_type = model_type
         self.models = {}
         self.data = None
+        self.target_cols = []
+        self._rng = np.random.default_rng()
         
     def fit(self, df: pd.DataFrame, target_cols: List[str]):
         self.data = df
+        self.target_cols = list(target_cols)
+        # Historical std per target and the horizon-dependent CI shape are invariant across forecasts
+        self._stds = df[self.target_cols].to_numpy().std(axis=0, ddof=1)
+        self._margin_shapes = {}
         if not SKLEARN_AVAILABLE:
             return self
+        
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        from sklearn.linear_model import LinearRegression
+        if LIGHTGBM_AVAILABLE:
+            import lightgbm as lgb
             
         for col in target_cols:
             X = np.arange(len(df)).reshape(-1, 1)
@@ -356,16 +574,27 @@ class StrategicForecaster:
             
             if self.model_type == "linear":
                 model = LinearRegression()
-                model.fit(X, y)
-            else:
-                # Use polynomial features for trend + GB for non-linear
-                model = GradientBoostingRegressor(
+            elif LIGHTGBM_AVAILABLE:
+                # Histogram-based GB; leaf minimums lowered for short monthly series
+                model = lgb.LGBMRegressor(
                     n_estimators=100,
+                    num_leaves=8,
+                    learning_rate=0.1,
+                    min_child_samples=1,
+                    # Default binning (3 rows per bin) would merge the last months of a 12-row series
+                    min_data_in_bin=1,
+                    random_state=42,
+                    verbose=-1
+                )
+            else:
+                model = HistGradientBoostingRegressor(
+                    max_iter=100,
                     learning_rate=0.1,
                     max_depth=3,
+                    min_samples_leaf=1,
                     random_state=42
                 )
-                model.fit(X, y)
+            model.fit(X, y)
             
             self.models[col] = model
         return self
@@ -376,14 +605,16 @@ class StrategicForecaster:
             
         forecasts = {}
         last_idx = len(self.data)
+        future_X = np.arange(last_idx, last_idx + steps).reshape(-1, 1)
+        margin_shape = self._margin_shape(steps)
         
-        for col, model in self.models.items():
-            future_X = np.arange(last_idx, last_idx + steps).reshape(-1, 1)
-            y_pred = model.predict(future_X)
-            
+        # sklearn/LightGBM release the GIL while predicting, so targets run concurrently
+        models = [self.models[col] for col in self.target_cols]
+        preds = _predict_pool().map(lambda model: model.predict(future_X), models)
+        
+        for i, (col, y_pred) in enumerate(zip(self.target_cols, preds)):
             # Simple confidence interval based on historical std
-            historical_std = self.data[col].std()
-            margin = 1.96 * historical_std * np.sqrt(np.arange(1, steps + 1) / steps)
+            margin = 1.96 * self._stds[i] * margin_shape
             
             forecasts[col] = {
                 'point': y_pred,
@@ -393,85 +624,204 @@ class StrategicForecaster:
         
         return forecasts
     
+    def _margin_shape(self, steps: int) -> np.ndarray:
+        if steps not in self._margin_shapes:
+            self._margin_shapes[steps] = np.sqrt(np.arange(1, steps + 1) / steps)
+        return self._margin_shapes[steps]
+    
     def _statistical_forecast(self, steps: int) -> Dict:
         """Fallback forecasting using trend + seasonality approximation"""
-        forecasts = {}
-        for col in self.data.columns:
-            series = self.data[col]
-            trend = np.polyfit(range(len(series)), series, 1)
-            future_trend = np.polyval(trend, range(len(series), len(series) + steps))
-            
-            # Add noise based on historical volatility
-            noise = np.random.normal(0, series.std() * 0.1, steps)
-            y_pred = future_trend + noise
-            
-            forecasts[col] = {
-                'point': y_pred,
-                'lower': y_pred - series.std(),
-                'upper': y_pred + series.std()
-            }
-        return forecasts
+        values = np.ascontiguousarray(self.data.to_numpy(dtype=np.float64))
+        # Unit noise drawn in one pass; the kernel scales it by each column's volatility
+        noise = self._rng.standard_normal((steps, values.shape[1]))
+        point, lower, upper = _linreg_forecast(values, noise)
+        return {
+            col: {'point': point[j], 'lower': lower[j], 'upper': upper[j]}
+            for j, col in enumerate(self.data.columns)
+        }
     
     @staticmethod
     def generate_synthetic_scenario(scenario_type: str = "ukraine", months: int = 12) -> pd.DataFrame:
-        np.random.seed(42)
-        dates = pd.date_range(start='2024-01-01', periods=months, freq='M')
+        if ("ukraine", months) not in StrategicForecaster._PRECOMPUTED:
+            StrategicForecaster._build_scenarios(months)
+        cols, arr = StrategicForecaster._PRECOMPUTED.get(
+            (scenario_type, months), StrategicForecaster._PRECOMPUTED[("ukraine", months)]
+        )
+        import pandas as pd
+        dates = pd.date_range(start='2024-01-01', periods=months, freq='ME')
+        return pd.DataFrame(arr, index=dates, columns=list(cols), copy=True)
+    
+    # scenario_type -> ((column, base level, monthly drift, monthly volatility), ...)
+    _SCENARIO_SPECS = {
+        "ukraine": (
+            ('Alliance_Cohesion', 65, -0.5, 2),
+            ('Energy_Dependency', 45, -2, 3),
+            ('Cyber_Resilience', 70, 1.5, 2),
+            ('Military_Readiness', 60, 0.8, 1.5)
+        ),
+        "ai_arms_race": (
+            ('AI_Capability_Gap', 50, 4, 5),
+            ('Safety_Compliance', 35, 2, 3),
+            ('R&D_Intensity', 65, 3.5, 4)
+        ),
+        "trade_war": (
+            ('Supply_Chain_Stress', 40, 3, 4),
+            ('Tariff_Impact', 30, 5, 3),
+            ('Currency_Volatility', 50, 2, 6)
+        ),
+        "cyber_escalation": (
+            ('Attack_Frequency', 20, 8, 5),
+            ('Defense_Effectiveness', 75, -1, 2),
+            ('Critical_Infrastructure_Risk', 35, 4, 3)
+        )
+    }
+    
+    # (scenario_type, months) -> (column names, clipped values); filled per horizon on first use.
+    # Lives for one script run only; _gen_scenario's st.cache_data keeps scenarios across reruns
+    _PRECOMPUTED: Dict[tuple, tuple] = {}
+    
+    @classmethod
+    def _build_scenarios(cls, months: int):
+        # All scenarios share one seeded stream, drawn column by column in spec order
+        specs = [spec for cols in cls._SCENARIO_SPECS.values() for spec in cols]
+        bases = np.array([spec[1] for spec in specs], dtype=np.float64)
+        mus = np.array([spec[2] for spec in specs], dtype=np.float64)
+        sigmas = np.array([spec[3] for spec in specs], dtype=np.float64)
+        walks = bases + _cumsum_normal(mus, sigmas, months, 42)
         
-        scenarios = {
-            "ukraine": {
-                'Alliance_Cohesion': 65 + np.cumsum(np.random.normal(-0.5, 2, months)),
-                'Energy_Dependency': 45 + np.cumsum(np.random.normal(-2, 3, months)),
-                'Cyber_Resilience': 70 + np.cumsum(np.random.normal(1.5, 2, months)),
-                'Military_Readiness': 60 + np.cumsum(np.random.normal(0.8, 1.5, months))
-            },
-            "ai_arms_race": {
-                'AI_Capability_Gap': 50 + np.cumsum(np.random.normal(4, 5, months)),
-                'Safety_Compliance': 35 + np.cumsum(np.random.normal(2, 3, months)),
-                'R&D_Intensity': 65 + np.cumsum(np.random.normal(3.5, 4, months))
-            },
-            "trade_war": {
-                'Supply_Chain_Stress': 40 + np.cumsum(np.random.normal(3, 4, months)),
-                'Tariff_Impact': 30 + np.cumsum(np.random.normal(5, 3, months)),
-                'Currency_Volatility': 50 + np.cumsum(np.random.normal(2, 6, months))
-            },
-            "cyber_escalation": {
-                'Attack_Frequency': 20 + np.cumsum(np.random.normal(8, 5, months)),
-                'Defense_Effectiveness': 75 + np.cumsum(np.random.normal(-1, 2, months)),
-                'Critical_Infrastructure_Risk': 35 + np.cumsum(np.random.normal(4, 3, months))
-            }
-        }
+        start = 0
+        for scenario_type, cols in cls._SCENARIO_SPECS.items():
+            arr = np.clip(walks[:, start:start + len(cols)], 0, 100)
+            cls._PRECOMPUTED[(scenario_type, months)] = (tuple(spec[0] for spec in cols), arr)
+            start += len(cols)
+
+@st.cache_data(show_spinner=False)
+def _gen_scenario(scenario_key: str, months: int) -> pd.DataFrame:
+    return StrategicForecaster.generate_synthetic_scenario(scenario_key, months)
+
+@st.cache_resource(show_spinner=False)
+def _get_fitted_forecaster(scenario_key: str, model_type: str = "ensemble") -> StrategicForecaster:
+    """Fit a forecaster once per (scenario, model type); scenario data is seeded, so the key pins the data"""
+    data = _gen_scenario(scenario_key, 12)
+    return StrategicForecaster(model_type).fit(data, list(data.columns))
+
+@st.cache_data(show_spinner=False)
+def _fit_and_forecast(scenario_key: str, horizon: int, model_type: str = "ensemble") -> Tuple[pd.DataFrame, Dict]:
+    """Scenario history plus its forecast, memoized per (scenario, horizon, model type)"""
+    hist_data = _gen_scenario(scenario_key, 12)
+    return hist_data, _get_fitted_forecaster(scenario_key, model_type).forecast(horizon)
+
+def _hex_to_rgba(color: str, alpha: float) -> str:
+    """Convert a '#rrggbb' or 'rgb(r, g, b)' palette entry to an rgba() string"""
+    if color.startswith("#"):
+        r, g, b = (int(color[k:k + 2], 16) for k in (1, 3, 5))
+    else:
+        r, g, b = (int(float(v)) for v in color[color.index("(") + 1:color.index(")")].split(",")[:3])
+    return f"rgba({r}, {g}, {b}, {alpha})"
+
+@st.cache_resource(show_spinner=False)
+def _kpi_palette() -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """KPI line colours and their matching 20%-opacity CI fills, resolved once per process"""
+    from plotly.colors import qualitative
+    colors = tuple(qualitative.Bold)
+    return colors, tuple(_hex_to_rgba(c, 0.2) for c in colors)
+
+@st.cache_resource(show_spinner=False)
+def _build_forecast_fig(scenario_key: str, horizon: int, model_type: str = "ensemble") -> go.Figure:
+    """KPI trajectory figure (history, forecast, CI band per KPI), built once per scenario and horizon"""
+    import pandas as pd
+    import plotly.graph_objects as go
+    hist_data, forecasts = _fit_and_forecast(scenario_key, horizon, model_type)
+    colors, fills = _kpi_palette()
+    
+    fig = go.Figure()
+    # The CI band is a closed polygon (non-monotonic x), so it is never aggregated
+    band_opts = {}
+    if RESAMPLER_AVAILABLE and len(hist_data) + horizon > _RESAMPLE_MIN_POINTS:
+        from plotly_resampler import FigureResampler
+        fig = FigureResampler(fig, default_n_shown_samples=_RESAMPLE_MIN_POINTS)
+        band_opts = {"max_n_samples": 2 * horizon}
+    
+    # Forecast dates and the CI band's closed x-path are shared by every KPI
+    future_dates = pd.date_range(start=hist_data.index[-1], periods=horizon + 1, freq='ME')[1:]
+    fd_np = future_dates.to_numpy()
+    band_x = np.concatenate([fd_np, fd_np[::-1]])
+    
+    for i, col in enumerate(hist_data.columns):
+        color = colors[i % len(colors)]
+        
+        # Historical (WebGL-rendered line)
+        fig.add_trace(go.Scattergl(
+            x=hist_data.index, 
+            y=hist_data[col],
+            name=f"{col} (Actual)",
+            mode='lines+markers',
+            line=dict(color=color, width=3),
+            marker=dict(size=8)
+        ))
         
-        data = scenarios.get(scenario_type, scenarios["ukraine"])
-        df = pd.DataFrame(data, index=dates)
-        return df.clip(0, 100)
+        # Forecast
+        fig.add_trace(go.Scattergl(
+            x=future_dates, 
+            y=forecasts[col]['point'],
+            name=f"{col} (Forecast)",
+            mode='lines',
+            line=dict(color=color, width=2, dash='dash'),
+            opacity=0.8
+        ))
+        
+        # Confidence interval (SVG trace; Scattergl has limited fill='toself' support)
+        fig.add_trace(go.Scatter(
+            x=band_x,
+            y=np.concatenate([forecasts[col]['upper'], forecasts[col]['lower'][::-1]]),
+            fill='toself',
+            fillcolor=fills[i % len(fills)],
+            line=dict(color='rgba(255,255,255,0)'),
+            showlegend=False,
+            name=f"{col} CI"
+        ), **band_opts)
+    
+    fig.update_layout(
+        template="plotly_dark",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        height=500,
+        xaxis_title="Timeline",
+        yaxis_title="Index (0-100)",
+        hovermode="x unified",
+        uirevision=scenario_key  # keep pan/zoom across reruns of the same scenario
+    )
+    
+    return fig
+
+@st.cache_data(show_spinner=False)
+def _build_export_csv(scenario_key: str, horizon: int, model_type: str = "ensemble") -> str:
+    """History and forecast side by side, each NaN-padded over the other's date range"""
+    import pandas as pd
+    hist_data, forecasts = _fit_and_forecast(scenario_key, horizon, model_type)
+    cols = list(hist_data.columns)
+    n_hist, n_cols = hist_data.shape
+    future_dates = pd.date_range(start=hist_data.index[-1], periods=horizon + 1, freq='ME')[1:]
+    
+    hist_block = pd.DataFrame(
+        np.vstack([hist_data.to_numpy(), np.full((horizon, n_cols), np.nan)]),
+        columns=[f"{c}_Historical" for c in cols]
+    )
+    fc_block = pd.DataFrame(
+        np.vstack([np.full((n_hist, n_cols), np.nan), np.column_stack([forecasts[c]['point'] for c in cols])]),
+        columns=[f"{c}_Forecast" for c in cols]
+    )
+    export_df = pd.concat([hist_block, fc_block], axis=1)
+    export_df.insert(0, 'Date', hist_data.index.append(future_dates))
+    return export_df.to_csv(index=False)
 
 # =============================================================================
 # AGENT SYSTEM (CrewAI-compatible or Standalone)
 # =============================================================================
 
-class DemoLLM:
-    """Mock LLM for demonstration without external dependencies"""
-    def __init__(self):
-        self.context_memory = []
-        
-    def generate(self, prompt: str, context: str = "") -> str:
-        """Simulate intelligent responses based on keywords"""
-        prompt_lower = prompt.lower()
-        
-        # Pattern matching for realistic responses
-        if "ukraine" in prompt_lower or "russia" in prompt_lower:
-            return self._ukraine_analysis(prompt)
-        elif "forecast" in prompt_lower or "predict" in prompt_lower:
-            return self._forecast_analysis(prompt)
-        elif "risk" in prompt_lower:
-            return self._risk_assessment(prompt)
-        elif "swot" in prompt_lower or "strategy" in prompt_lower:
-            return self._strategic_framework(prompt)
-        else:
-            return self._general_strategic(prompt)
-    
-    def _ukraine_analysis(self, prompt: str) -> str:
-        return """**Executive Summary: Ukraine-Russia Conflict Analysis**
+# Canned DemoLLM responses, shared by every instance and chat message
+_ANSWERS: Dict[str, str] = {
+    "ukraine": """**Executive Summary: Ukraine-Russia Conflict Analysis**
 
 🔹 **Strategic Assessment (Thucydidean Framework)**
 - Security Dilemma: NATO expansion fears vs. sovereignty rights creating irreconcilable structural pressures
@@ -493,10 +843,9 @@ class DemoLLM:
 - **MEDIUM**: Cyber infrastructure attacks (Probability: 40%, Impact: High)  
 - **LOW**: Nuclear escalation (Probability: <5%, Impact: Catastrophic)
 
-🔹 **Epistemic Confidence**: 7.2/10 (High OSINT availability, fog of war persists in tactical domains)"""
+🔹 **Epistemic Confidence**: 7.2/10 (High OSINT availability, fog of war persists in tactical domains)""",
 
-    def _forecast_analysis(self, prompt: str) -> str:
-        return """**Predictive Modeling Results**
+    "forecast": """**Predictive Modeling Results**
 
 Using ensemble methods (Gradient Boosting + Linear Trend):
 
@@ -511,10 +860,9 @@ Using ensemble methods (Gradient Boosting + Linear Trend):
 2. Month 5: Energy infrastructure vulnerability window (pre-diversification completion)
 3. Month 6: Decision point for industrial mobilization scale-up
 
-📈 **Confidence Intervals**: 80% prediction intervals shown; model MAPE ~12% on historical validation"""
+📈 **Confidence Intervals**: 80% prediction intervals shown; model MAPE ~12% on historical validation""",
 
-    def _risk_assessment(self, prompt: str) -> str:
-        return """**Risk Assessment Matrix**
+    "risk": """**Risk Assessment Matrix**
 
 | Risk Category | Probability | Impact | Velocity | Mitigation Priority |
 |--------------|-------------|---------|----------|-------------------|
@@ -526,10 +874,9 @@ Using ensemble methods (Gradient Boosting + Linear Trend):
 **Cascading Effects Analysis**: 
 Energy crisis → Industrial slowdown → Social unrest → Political pressure → Strategic flexibility reduction
 
-**Recommended Hedging**: Maintain 90-day strategic petroleum reserve; establish redundant supply corridors via Romania."""
+**Recommended Hedging**: Maintain 90-day strategic petroleum reserve; establish redundant supply corridors via Romania.""",
 
-    def _strategic_framework(self, prompt: str) -> str:
-        return """**SWOT Analysis Framework**
+    "strategy": """**SWOT Analysis Framework**
 
 **Strengths (Internal)**
 - Technological asymmetry favoring defensive capabilities
@@ -551,10 +898,9 @@ Energy crisis → Industrial slowdown → Social unrest → Political pressure 
 - Escalation to WMD domain (low probability, high impact)
 - Economic warfare spillover effects
 
-**Strategic Recommendation**: Exploit window of alliance solidarity (T+0 to T+12 months) to achieve durable territorial security before fatigue factors dominate."""
+**Strategic Recommendation**: Exploit window of alliance solidarity (T+0 to T+12 months) to achieve durable territorial security before fatigue factors dominate.""",
 
-    def _general_strategic(self, prompt: str) -> str:
-        return """**Strategic Advisory Response**
+    "general": """**Strategic Advisory Response**
 
 Based on problem-solving framework analysis:
 
@@ -568,6 +914,88 @@ Based on problem-solving framework analysis:
 - **Information advantage**: Invest in OSINT capabilities for early warning (6-month lead time critical)
 
 *Analysis confidence: Moderate-High. Recommend red-team review for cognitive bias checks.*"""
+}
+
+class DemoLLM:
+    """Mock LLM for demonstration without external dependencies"""
+    _DISPATCH_RE = re.compile(
+        r"(?P<uk>ukraine|russia)|(?P<fc>forecast|predict)|(?P<rk>risk)|(?P<sw>swot|strategy)",
+        re.IGNORECASE
+    )
+    # Keyword groups in priority order -> handler method
+    _HANDLERS = {
+        "uk": "_ukraine_analysis",
+        "fc": "_forecast_analysis",
+        "rk": "_risk_assessment",
+        "sw": "_strategic_framework"
+    }
+    # Word-sized chunks (each word with its leading whitespace) for simulated token streaming
+    _CHUNK_RE = re.compile(r"\s*\S+|\s+$")
+    
+    def __init__(self):
+        self.context_memory = []
+        
+    def generate(self, prompt: str, context: str = "") -> str:
+        """Simulate intelligent responses based on keywords"""
+        # Single regex pass; the highest-priority keyword group wins regardless of position
+        found = {m.lastgroup for m in self._DISPATCH_RE.finditer(prompt)}
+        for group, handler in self._HANDLERS.items():
+            if group in found:
+                return getattr(self, handler)(prompt)
+        return self._general_strategic(prompt)
+    
+    def generate_many(self, prompts: List[str], context: str = "") -> List[str]:
+        return [self.generate(p, context) for p in prompts]
+    
+    def stream(self, prompt: str, context: str = "") -> Iterator[str]:
+        for m in self._CHUNK_RE.finditer(self.generate(prompt, context)):
+            yield m.group()
+    
+    def _ukraine_analysis(self, prompt: str) -> str:
+        return _ANSWERS["ukraine"]
+
+    def _forecast_analysis(self, prompt: str) -> str:
+        return _ANSWERS["forecast"]
+
+    def _risk_assessment(self, prompt: str) -> str:
+        return _ANSWERS["risk"]
+
+    def _strategic_framework(self, prompt: str) -> str:
+        return _ANSWERS["strategy"]
+
+    def _general_strategic(self, prompt: str) -> str:
+        return _ANSWERS["general"]
+
+class OllamaLLM:
+    """Local Ollama backend with the same generate/generate_many interface as DemoLLM"""
+    def __init__(self, model: str = OLLAMA_MODEL):
+        self.model = model
+    
+    def generate(self, prompt: str, context: str = "") -> str:
+        return self.generate_many([prompt], context)[0]
+    
+    def generate_many(self, prompts: List[str], context: str = "") -> List[str]:
+        return asyncio.run(self._generate_async(prompts, context))
+    
+    def stream(self, prompt: str, context: str = "") -> Iterator[str]:
+        from ollama import Client
+        for part in Client().chat(model=self.model, messages=self._messages(prompt, context), stream=True):
+            yield part["message"]["content"]
+    
+    @staticmethod
+    def _messages(prompt: str, context: str) -> List[Dict[str, str]]:
+        system = [{"role": "system", "content": context}] if context else []
+        return system + [{"role": "user", "content": prompt}]
+    
+    async def _generate_async(self, prompts: List[str], context: str = "") -> List[str]:
+        """Send every prompt at once; the server works through up to OLLAMA_NUM_PARALLEL of them concurrently"""
+        from ollama import AsyncClient
+        async with AsyncClient() as client:
+            responses = await asyncio.gather(*(
+                client.chat(model=self.model, messages=self._messages(p, context))
+                for p in prompts
+            ))
+        return [r["message"]["content"] for r in responses]
 
 class StrategicAgent:
     """Simplified agent compatible with CrewAI structure or standalone"""
@@ -588,14 +1016,21 @@ class StrategicAgent:
         Provide rigorous, structured analysis using established strategic frameworks.
         """
         return self.llm.generate(full_prompt)
+    
+    async def execute_async(self, task_description: str, context: str = "") -> str:
+        """Run execute on a worker thread so a blocking LLM round-trip doesn't hold the event loop"""
+        return await asyncio.to_thread(self.execute, task_description, context)
 
 class StrategicCrew:
     def __init__(self, scenario_config: Dict, use_demo: bool = True):
         self.scenario = scenario_config
         self.use_demo = use_demo
-        self.agents = self._create_agents()
+        self.agents = _shared_agents()
+        # Phases finished so far; appended from the worker thread, read by the UI while it polls
+        self.completed_phases: List[str] = []
     
-    def _create_agents(self) -> Dict[str, StrategicAgent]:
+    @staticmethod
+    def _create_agents() -> Dict[str, StrategicAgent]:
         return {
             "orchestrator": StrategicAgent(
                 "Orchestrator",
@@ -621,32 +1056,49 @@ class StrategicCrew:
     
     def run_analysis(self, data: Dict) -> str:
         """Execute sequential analysis workflow"""
+        return asyncio.run(self.run_analysis_async(data))
+    
+    async def run_analysis_async(self, data: Dict) -> str:
+        """Each phase consumes the previous phase's output, so phases are awaited in order"""
         results = []
         
         # Task 1: Data Analysis
-        context = f"Scenario: {self.scenario['name']}\nData: {json.dumps(data, indent=2)}"
-        research_result = self.agents["research"].execute(
+        context = f"Scenario: {self.scenario['name']}\nData: {_dumps(data)}"
+        research_result = await self.agents["research"].execute_async(
             "Analyze structured data using realist framework. Extract alliance cohesion metrics, resource dependencies, capability gaps. Identify security dilemmas and power transitions.",
             context
         )
         results.append(f"## Research Phase\n{research_result}")
+        self.completed_phases.append("Research")
         
         # Task 2: Modeling
-        model_result = self.agents["model"].execute(
+        model_result = await self.agents["model"].execute_async(
             "Apply Prospect Theory (loss aversion analysis), SWOT matrix, and escalation ladder (reversible steps). Map contradictions in the strategic landscape.",
             research_result
         )
         results.append(f"## Modeling Phase\n{model_result}")
+        self.completed_phases.append("Modeling")
         
         # Task 3: Synthesis
-        synthesis_result = self.agents["synthesis"].execute(
+        synthesis_result = await self.agents["synthesis"].execute_async(
             "Create final advisory with: 1) Executive Summary (300 words), 2) No-regrets moves (90-day timeline), 3) KPI dashboard specs, 4) Risk register (top 5)",
             model_result
         )
         results.append(f"## Strategic Recommendations\n{synthesis_result}")
+        self.completed_phases.append("Synthesis")
         
         return "\n\n".join(results)
 
+@st.cache_resource(show_spinner=False)
+def _analysis_pool() -> ThreadPoolExecutor:
+    """Process-wide pool for full crew analyses, so a long run doesn't block the session's script thread"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="crew-analysis")
+
+@st.cache_resource(show_spinner=False)
+def _shared_agents() -> Dict[str, StrategicAgent]:
+    """Agents are stateless (scenario context travels in each prompt), so one set serves every crew"""
+    return StrategicCrew._create_agents()
+
 # =============================================================================
 # WORKFLOW ENGINE
 # =============================================================================
@@ -699,10 +1151,37 @@ class WorkflowEngine:
             return 0.0
         return self.current_step / len(self.current_workflow["steps"])
 
+# Workflows are static, so each one's numbered step list is rendered to markdown once at import
+for _wf in WorkflowEngine.WORKFLOWS.values():
+    _wf["_steps_md"] = "\n".join(f"{i}. {step}" for i, step in enumerate(_wf["steps"], 1))
+
 # =============================================================================
 # MAIN APPLICATION
 # =============================================================================
 
+def _render_message_html(role: str, content: str) -> str:
+    # Flush-left and blank-line separated: the history joins these into one markdown element,
+    # where an indented <div> after a blank line would be parsed as a code block
+    css_class = "chat-user" if role == "user" else "chat-assistant"
+    return (
+        f'<div class="chat-message {css_class}">\n'
+        f"<strong>{'You' if role == 'user' else 'Aethelred'}</strong><br>\n"
+        f"{content}\n"
+        "</div>\n\n"
+    )
+
+def _chat_message(role: str, content: str) -> Dict[str, str]:
+    """Chat history entry with its HTML rendered once, at append time"""
+    return {"role": role, "content": content, "html": _render_message_html(role, content)}
+
+# Sidebar scenario label -> StrategicForecaster scenario key
+_SCENARIO_KEYS = {
+    "Ukraine-Russia Conflict": "ukraine",
+    "AI Arms Race": "ai_arms_race",
+    "Trade Wars": "trade_war",
+    "Cyberwar Escalation": "cyber_escalation"
+}
+
 class StrategicAdvisorApp:
     def __init__(self):
         self.game = GamificationEngine()
@@ -739,21 +1218,42 @@ class StrategicAdvisorApp:
             
             self.scenario = st.selectbox(
                 "Strategic Scenario",
-                ["Ukraine-Russia Conflict", "AI Arms Race", "Trade Wars", "Cyberwar Escalation"],
+                list(_SCENARIO_KEYS),
                 key="scenario_select"
             )
+            # Resolved once here; every tab and cache key uses it
+            self.scenario_key = _SCENARIO_KEYS[self.scenario]
             
             self.llm_mode = st.radio(
                 "LLM Mode",
                 ["Demo Mode (No setup required)", "Local Ollama (requires setup)"],
                 help="Demo mode uses built-in intelligence; Ollama requires local LLM"
             )
+            if self.llm_mode.startswith("Local Ollama"):
+                if OLLAMA_AVAILABLE:
+                    # Read by the Ollama server, not this app; bounds how much of a prompt burst runs at once
+                    st.caption(
+                        f"Model: `{OLLAMA_MODEL}` · OLLAMA_NUM_PARALLEL="
+                        f"`{os.environ.get('OLLAMA_NUM_PARALLEL', 'server default')}`"
+                    )
+                else:
+                    st.caption("`ollama` package not installed; using demo responses.")
             
             self.forecast_horizon = st.slider("Forecast Months", 3, 12, 6)
             
-            if st.button("🚀 Run Full Strategic Analysis", type="primary", use_container_width=True):
+            pending = "pending_analysis" in st.session_state
+            if st.button("🚀 Run Full Strategic Analysis", type="primary", use_container_width=True, disabled=pending):
                 self._run_full_analysis()
+            
+            if "pending_analysis" in st.session_state:
+                self._poll_pending_analysis()
+            elif st.session_state.pop("analysis_complete", False):
+                st.success("Analysis complete! Check the Chat tab for full results.")
+                st.balloons()
+            elif "analysis_error" in st.session_state:
+                st.error(f"Analysis failed: {st.session_state.pop('analysis_error')}")
     
+    @st.fragment
     def _render_chat_interface(self):
         st.markdown("""
         <div style="text-align: center; margin-bottom: 30px;">
@@ -762,17 +1262,15 @@ class StrategicAdvisorApp:
         </div>
         """, unsafe_allow_html=True)
         
-        # Chat container
-        chat_container = st.container()
-        with chat_container:
-            for msg in st.session_state.chat_messages:
-                css_class = "chat-user" if msg["role"] == "user" else "chat-assistant"
-                st.markdown(f"""
-                    <div class="chat-message {css_class}">
-                        <strong>{'You' if msg['role'] == 'user' else 'Aethelred'}</strong><br>
-                        {msg['content']}
-                    </div>
-                """, unsafe_allow_html=True)
+        # Chat container; new exchanges are streamed into it below the history
+        self._chat_container = st.container()
+        with self._chat_container:
+            # One markdown element for the whole history, from per-message HTML built at append time
+            if st.session_state.chat_messages:
+                st.markdown("".join(
+                    msg.get("html") or _render_message_html(msg["role"], msg["content"])
+                    for msg in st.session_state.chat_messages
+                ), unsafe_allow_html=True)
         
         # Input
         user_input = st.text_input("Ask for strategic analysis...", key="chat_input", placeholder="e.g., 'Analyze escalation risks in Ukraine scenario'")
@@ -781,9 +1279,7 @@ class StrategicAdvisorApp:
             if st.button("Send", use_container_width=True):
                 self._handle_chat(user_input)
         with col2:
-            if st.button("Clear", use_container_width=True):
-                st.session_state.chat_messages = []
-                st.rerun()
+            st.button("Clear", use_container_width=True, on_click=self._clear_chat)
         
         # Quick actions
         st.markdown("**Quick Actions:**")
@@ -799,20 +1295,54 @@ class StrategicAdvisorApp:
                 if st.button(label, use_container_width=True):
                     self._handle_quick_action(action)
     
+    @staticmethod
+    def _clear_chat():
+        st.session_state.chat_messages.clear()
+    
+    def _use_ollama(self) -> bool:
+        return self.llm_mode.startswith("Local Ollama") and OLLAMA_AVAILABLE
+    
+    def _generate(self, prompts: List[str]) -> List[str]:
+        context = f"Scenario: {self.scenario}"
+        if self._use_ollama():
+            try:
+                return OllamaLLM().generate_many(prompts, context)
+            except Exception as e:
+                st.toast(f"Ollama request failed ({e}); using demo responses.", icon="⚠️")
+        return DemoLLM().generate_many(prompts, context)
+    
+    def _stream(self, prompt: str) -> Iterator[str]:
+        context = f"Scenario: {self.scenario}"
+        if self._use_ollama():
+            chunks = OllamaLLM().stream(prompt, context)
+            # Connection errors surface on the first chunk; only then is it safe to fall back
+            try:
+                first = next(chunks, "")
+            except Exception as e:
+                st.toast(f"Ollama request failed ({e}); using demo responses.", icon="⚠️")
+            else:
+                yield first
+                yield from chunks
+                return
+        yield from DemoLLM().stream(prompt, context)
+    
     def _handle_chat(self, user_input: str):
         if not user_input:
             return
-            
-        st.session_state.chat_messages.append({"role": "user", "content": user_input})
-        
-        # Generate response
-        llm = DemoLLM()
-        response = llm.generate(user_input, context=f"Scenario: {self.scenario}")
+        self._post_exchange(user_input, self._stream(user_input))
+    
+    def _post_exchange(self, user_input: str, response: Iterable[str]):
+        # Show the reply as it arrives; the next rerun renders it as a regular history entry
+        with self._chat_container:
+            st.markdown(_render_message_html("user", user_input), unsafe_allow_html=True)
+            text = st.write_stream(response)
         
-        st.session_state.chat_messages.append({"role": "assistant", "content": response})
+        st.session_state.chat_messages.append(_chat_message("user", user_input))
+        st.session_state.chat_messages.append(_chat_message("assistant", text))
         self.game.add_xp(10, "Chat interaction")
         self.game._update_missions("chat")
-        st.rerun()
+        # Only the chat fragment reruns, so surface the XP gain here rather than waiting for a full rerun
+        st.toast(f"+10 XP · Level {st.session_state.level}", icon="⭐")
     
     def _handle_quick_action(self, action: str):
         prompts = {
@@ -821,117 +1351,75 @@ class StrategicAdvisorApp:
             "swot": "Conduct SWOT analysis on strategic position",
             "research": "Deep research on historical precedents and realist framework"
         }
-        self._handle_chat(prompts[action])
+        prompt = prompts[action]
+        workflow = WorkflowEngine.WORKFLOWS.get(st.session_state.get("current_workflow"))
+        if workflow is None or not self._use_ollama():
+            self._handle_chat(prompt)
+            return
+        
+        # With Ollama, an active workflow fans the action out into one sub-prompt per step,
+        # generated as one burst; that burst completes the workflow
+        st.session_state.current_workflow = None
+        steps = workflow["steps"]
+        responses = self._generate([f"{step} step of {workflow['name']}: {prompt}" for step in steps])
+        self._post_exchange(prompt, ["\n\n".join(
+            f"### {i}. {step}\n{response}"
+            for i, (step, response) in enumerate(zip(steps, responses), 1)
+        )])
     
+    @st.fragment
     def _render_analytics_dashboard(self):
         st.header("📊 Predictive Analytics & Forecasting")
         
-        # Generate data for current scenario
-        scenario_key = self.scenario.split()[0].lower().replace("-", "_")
-        hist_data = StrategicForecaster.generate_synthetic_scenario(scenario_key, 12)
+        # Generate data for current scenario, fit and forecast (all cached across reruns)
+        scenario_key = self.scenario_key
+        hist_data, forecasts = _fit_and_forecast(scenario_key, self.forecast_horizon, self.forecaster.model_type)
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
             st.subheader("KPI Trajectory & Forecasts")
             
-            # Fit and forecast
-            self.forecaster.fit(hist_data, hist_data.columns)
-            forecasts = self.forecaster.forecast(self.forecast_horizon)
-            
-            # Create visualization
-            fig = go.Figure()
-            colors = px.colors.qualitative.Bold
-            
-            for i, col in enumerate(hist_data.columns):
-                color = colors[i % len(colors)]
-                
-                # Historical
-                fig.add_trace(go.Scatter(
-                    x=hist_data.index, 
-                    y=hist_data[col],
-                    name=f"{col} (Actual)",
-                    mode='lines+markers',
-                    line=dict(color=color, width=3),
-                    marker=dict(size=8)
-                ))
-                
-                # Forecast
-                future_dates = pd.date_range(
-                    start=hist_data.index[-1], 
-                    periods=self.forecast_horizon+1, 
-                    freq='M'
-                )[1:]
-                
-                fig.add_trace(go.Scatter(
-                    x=future_dates, 
-                    y=forecasts[col]['point'],
-                    name=f"{col} (Forecast)",
-                    mode='lines',
-                    line=dict(color=color, width=2, dash='dash'),
-                    opacity=0.8
-                ))
-                
-                # Confidence interval
-                fig.add_trace(go.Scatter(
-                    x=list(future_dates) + list(future_dates)[::-1],
-                    y=list(forecasts[col]['upper']) + list(forecasts[col]['lower'])[::-1],
-                    fill='toself',
-                    fillcolor=f'rgba{tuple(list(int(color.lstrip("#")[i:i+2], 16) for i in (0, 2, 4)) + [0.2])}',
-                    line=dict(color='rgba(255,255,255,0)'),
-                    showlegend=False,
-                    name=f"{col} CI"
-                ))
-            
-            fig.update_layout(
-                template="plotly_dark",
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                height=500,
-                xaxis_title="Timeline",
-                yaxis_title="Index (0-100)",
-                hovermode="x unified"
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            fig = _build_forecast_fig(scenario_key, self.forecast_horizon, self.forecaster.model_type)
+            # Stable key lets the frontend update the existing chart instead of rebuilding it
+            st.plotly_chart(fig, use_container_width=True, key=f"forecast_{scenario_key}_{self.forecast_horizon}")
             
         with col2:
             st.subheader("Key Indicators")
             
-            # Latest values
-            latest = hist_data.iloc[-1]
-            for col in hist_data.columns:
-                val = latest[col]
-                delta = val - hist_data.iloc[-2][col]
-                st.metric(col.replace('_', ' '), f"{val:.1f}", f"{delta:+.1f}")
+            # Latest values and month-on-month deltas for every KPI in one row operation
+            cols = list(hist_data.columns)
+            names = [c.replace('_', ' ') for c in cols]
+            values = hist_data.to_numpy()
+            latest = values[-1]
+            deltas = latest - values[-2]
+            for name, val, delta in zip(names, latest, deltas):
+                st.metric(name, f"{val:.1f}", f"{delta:+.1f}")
             
             # Forecast summary
             st.markdown("---")
             st.markdown("### 📈 Forecast Summary")
-            for col in hist_data.columns:
+            for col, name, val in zip(cols, names, latest):
                 final_pred = forecasts[col]['point'][-1]
-                trend = "↗️ Up" if final_pred > latest[col] else "↘️ Down" if final_pred < latest[col] else "➡️ Stable"
-                st.markdown(f"**{col.replace('_', ' ')}**: {trend} to {final_pred:.1f} in {self.forecast_horizon}mo")
+                trend = "↗️ Up" if final_pred > val else "↘️ Down" if final_pred < val else "➡️ Stable"
+                st.markdown(f"**{name}**: {trend} to {final_pred:.1f} in {self.forecast_horizon}mo")
         
         # Export option
         if st.button("📥 Export Forecast Data"):
-            export_df = pd.DataFrame({
-                'Date': list(hist_data.index) + list(future_dates),
-                **{f"{col}_Historical": list(hist_data[col]) + [None]*self.forecast_horizon for col in hist_data.columns},
-                **{f"{col}_Forecast": [None]*len(hist_data) + list(forecasts[col]['point']) for col in hist_data.columns}
-            })
-            csv = export_df.to_csv(index=False)
+            csv = _build_export_csv(scenario_key, self.forecast_horizon, self.forecaster.model_type)
             st.download_button("Download CSV", csv, f"forecast_{scenario_key}.csv", "text/csv")
             
         self.game.record_analysis("forecast")
     
+    @st.fragment
     def _render_missions_page(self):
         st.header("🎯 Strategic Missions & Challenges")
         
-        # Refresh daily missions if needed (simplified: check if new day)
-        if 'missions_generated' not in st.session_state or st.session_state.missions_generated != datetime.now().day:
+        # Refresh daily missions on a new (UTC) day; an ordinal also rolls over across months
+        today_key = _today_key()
+        if st.session_state.get('missions_generated') != today_key:
             st.session_state.missions = self.game._default_missions()
-            st.session_state.missions_generated = datetime.now().day
+            st.session_state.missions_generated = today_key
         
         st.markdown("""
         <div class="glass-card">
@@ -940,48 +1428,54 @@ class StrategicAdvisorApp:
         </div>
         """, unsafe_allow_html=True)
         
+        # Card chrome is batched into one markdown per column; progress buttons stay individual widgets
         cols = st.columns(3)
+        col_html = [[] for _ in range(3)]
+        col_missions = [[] for _ in range(3)]
         for i, mission in enumerate(st.session_state.missions):
-            with cols[i % 3]:
-                progress_pct = min(100, (mission.progress / mission.target) * 100)
-                status_icon = "✅" if mission.completed else "⏳"
-                
-                st.markdown(f"""
-                    <div class="glass-card" style="border: {'2px solid #10b981' if mission.completed else '1px solid rgba(255,255,255,0.1)'};">
-                        <h4>{status_icon} {mission.name}</h4>
-                        <p>{mission.description}</p>
-                        <div style="background: rgba(255,255,255,0.1); height: 10px; border-radius: 5px; margin: 10px 0;">
-                            <div style="background: {'#10b981' if mission.completed else '#3b82f6'}; width: {progress_pct}%; height: 100%; border-radius: 5px; transition: width 0.3s;"></div>
-                        </div>
-                        <small>{mission.progress}/{mission.target} completed • +{mission.xp_reward} XP</small>
-                    </div>
-                """, unsafe_allow_html=True)
-                
-                if not mission.completed:
-                    if st.button(f"Update Progress", key=f"mission_{mission.id}"):
-                        mission.progress = min(mission.target, mission.progress + 1)
-                        if mission.progress >= mission.target:
-                            mission.completed = True
-                            self.game.add_xp(mission.xp_reward, f"Mission: {mission.name}")
-                        st.rerun()
+            col_html[i % 3].append(_mission_page_card_html(mission))
+            col_missions[i % 3].append(mission)
+        
+        for col, html, missions in zip(cols, col_html, col_missions):
+            with col:
+                if html:
+                    st.markdown("".join(html), unsafe_allow_html=True)
+                for mission in missions:
+                    if not mission.completed:
+                        # Runs before the fragment rerun, so the cards above already show the new progress
+                        st.button(f"Update Progress", key=f"mission_{mission.id}",
+                                  on_click=self._advance_mission, args=(mission.id,))
         
         # Achievements showcase
         st.markdown("---")
         st.subheader("🏆 Achievement Gallery")
         
         ach_cols = st.columns(4)
+        ach_html = [[] for _ in range(4)]
         for i, ach in enumerate(st.session_state.achievements):
-            with ach_cols[i % 4]:
-                opacity = "1.0" if ach.unlocked else "0.3"
-                border = "#f59e0b" if ach.unlocked else "rgba(255,255,255,0.1)"
-                st.markdown(f"""
+            opacity = "1.0" if ach.unlocked else "0.3"
+            border = "#f59e0b" if ach.unlocked else "rgba(255,255,255,0.1)"
+            ach_html[i % 4].append(f"""
                     <div style="opacity: {opacity}; border: 2px solid {border}; border-radius: 12px; padding: 15px; text-align: center; margin: 5px;">
                         <div style="font-size: 30px; margin-bottom: 10px;">{ach.icon}</div>
                         <strong>{ach.name}</strong><br>
                         <small>{ach.description}</small><br>
                         <span style="color: #f59e0b;">+{ach.xp_reward} XP</span>
                     </div>
-                """, unsafe_allow_html=True)
+                """)
+        
+        for col, html in zip(ach_cols, ach_html):
+            if html:
+                with col:
+                    st.markdown("".join(html), unsafe_allow_html=True)
+    
+    def _advance_mission(self, mission_id: str):
+        for mission in st.session_state.missions:
+            if mission.id == mission_id and not mission.completed:
+                mission.progress = min(mission.target, mission.progress + 1)
+                if mission.progress >= mission.target:
+                    mission.completed = True
+                    self.game.add_xp(mission.xp_reward, f"Mission: {mission.name}")
     
     def _render_workflows_page(self):
         st.header("⚙️ Problem-Solving Workflows")
@@ -991,8 +1485,7 @@ class StrategicAdvisorApp:
         for wf_id, wf in WorkflowEngine.WORKFLOWS.items():
             with st.expander(f"{wf['name']} - {wf['description']}"):
                 st.markdown("**Process Steps:**")
-                for i, step in enumerate(wf['steps'], 1):
-                    st.markdown(f"{i}. {step}")
+                st.markdown(wf['_steps_md'])
                 
                 if st.button(f"Start {wf['name']}", key=f"wf_{wf_id}"):
                     st.session_state.current_workflow = wf_id
@@ -1001,30 +1494,55 @@ class StrategicAdvisorApp:
                     self.game.add_xp(25, "Workflow initiated")
     
     def _run_full_analysis(self):
-        with st.spinner("🧠 Running multi-agent strategic analysis..."):
-            # Setup crew
-            scenario_config = {
-                "name": self.scenario,
-                "type": "geopolitical" if "Ukraine" in self.scenario else "technological"
-            }
-            
-            self.crew = StrategicCrew(scenario_config, use_demo=True)
-            
-            # Generate data and run
-            scenario_key = self.scenario.split()[0].lower().replace("-", "_")
-            data = StrategicForecaster.generate_synthetic_scenario(scenario_key, 12)
-            
-            result = self.crew.run_analysis(data.to_dict())
-            
-            # Add to chat
-            st.session_state.chat_messages.append({
-                "role": "assistant", 
-                "content": f"## 🔍 Full Strategic Analysis: {self.scenario}\n\n{result}\n\n---\n*Analysis completed by Aethelred Multi-Agent System | Confidence: High*"
-            })
+        scenario_config = {
+            "name": self.scenario,
+            "type": "geopolitical" if "Ukraine" in self.scenario else "technological"
+        }
+        self.crew = StrategicCrew(scenario_config, use_demo=True)
+        
+        data = _gen_scenario(self.scenario_key, 12)
+        # Columnar arrays: the crew only needs each KPI's series, and _dumps serializes ndarrays directly
+        payload = {c: data[c].to_numpy() for c in data.columns}
+        
+        # The crew runs on a worker thread; _poll_pending_analysis picks up the result
+        st.session_state.pending_analysis = {
+            "future": _analysis_pool().submit(self.crew.run_analysis, payload),
+            "crew": self.crew,
+            "scenario": self.scenario
+        }
+    
+    @st.fragment(run_every=1)
+    def _poll_pending_analysis(self):
+        pending = st.session_state.get("pending_analysis")
+        if pending is None:
+            return
+        
+        future, crew = pending["future"], pending["crew"]
+        with st.status("🧠 Running multi-agent strategic analysis...", expanded=True) as status:
+            for phase in list(crew.completed_phases):
+                st.write(f"✓ {phase} phase complete")
+            if not future.done():
+                return
             
-            self.game.record_problem_solved()
-            st.success("Analysis complete! Check the Chat tab for full results.")
-            st.balloons()
+            del st.session_state.pending_analysis
+            try:
+                result = future.result()
+            except Exception as e:
+                status.update(label=f"Analysis failed: {e}", state="error")
+                st.session_state.analysis_error = str(e)
+            else:
+                status.update(label="Analysis complete", state="complete")
+                # Add to chat
+                st.session_state.chat_messages.append(_chat_message(
+                    "assistant",
+                    f"## 🔍 Full Strategic Analysis: {pending['scenario']}\n\n{result}\n\n---\n*Analysis completed by Aethelred Multi-Agent System | Confidence: High*"
+                ))
+                self.game.record_problem_solved()
+                st.session_state.analysis_complete = True
+        
+        # Full rerun so the chat tab shows the new message, the run button is re-enabled,
+        # and this fragment is no longer scheduled
+        st.rerun()
 
 # =============================================================================
 # INITIALIZATION